@@ -1,13 +1,33 @@
+import asyncio
+import functools
+import math
 import sys
+from collections.abc import Iterator
 from pathlib import Path
-import json
 import os
+import re
+import time
 
-from langchain_core.output_parsers.string import StrOutputParser
 from langchain.prompts import ChatPromptTemplate
-from langchain.schema import OutputParserException
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import BaseMessage
 from langchain_openai import ChatOpenAI
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 from dotenv import load_dotenv
+import orjson
 
 load_dotenv()
 
@@ -16,6 +36,11 @@ BASE_DIR = Path(__file__).resolve().parent
 DIRETORIO_PROMPTS = BASE_DIR / "prompts" / "system"
 DIRETORIO_REDACAO = BASE_DIR / "redacao"
 ARQUIVO_SCORE = BASE_DIR / 'descricao_score.json'
+ARQUIVO_RESULTADO = BASE_DIR / "resultado_nota.json"
+# Resultados parciais (uma redação por linha), gravados à medida que cada uma termina.
+ARQUIVO_PARCIAL = BASE_DIR / "resultado_nota.jsonl"
+# Id do batch em andamento (BATCH=true), para retomar o acompanhamento se o script parar.
+ARQUIVO_BATCH = BASE_DIR / "resultado_nota.batch"
 ARQIVOS_PROMPTS = [  # mantido o nome original da variável
     "c1_escrita_formal.txt",
     "c2_tema.txt",
@@ -24,6 +49,42 @@ ARQIVOS_PROMPTS = [  # mantido o nome original da variável
     "c5_intervencao.txt",
 ]
 
+# Modelo padrão da avaliação; a saída é só uma nota, então um modelo pequeno basta.
+# Um critério pode usar outro modelo via EVAL_MODEL_<PREFIXO> (ex.: EVAL_MODEL_C3=gpt-4o).
+MODELO = os.getenv("EVAL_MODEL", "gpt-4o-mini")
+# A nota cabe em poucos tokens; limitar a saída encerra a geração logo após o número.
+# Não vale para modelos de raciocínio (ver PREFIXOS_MODELOS_RACIOCINIO).
+MAX_TOKENS_NOTA = 4
+# Modelos de raciocínio (gpt-5, série o) gastam tokens de raciocínio do mesmo limite
+# de saída (com um limite pequeno, a resposta volta vazia) e recusam temperature
+# diferente da padrão. Neles nenhum dos dois é enviado.
+PREFIXOS_MODELOS_RACIOCINIO = ("gpt-5", "o1", "o3", "o4")
+
+# Cache local das respostas do LLM (configurado em main() via configura_cache).
+ARQUIVO_CACHE_LLM = BASE_DIR / ".langchain.db"
+
+# Quantas redações são avaliadas ao mesmo tempo (respeita o rate limit do provedor):
+# é o número de workers que consomem o gerador de redações em main().
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "8"))
+
+# BATCH=true envia todas as combinações (redação x critério) pela Batch API da OpenAI
+# (custo menor, mas resultado assíncrono); caso contrário, usa chamadas diretas.
+USAR_BATCH = os.getenv("BATCH", "false").strip().lower() in ("1", "true", "sim", "yes")
+BATCH_INTERVALO_POLL = 30  # segundos entre consultas ao status do batch
+
+# FUNDIR_CRITERIOS=true avalia os cinco critérios numa única chamada por redação
+# (saída estruturada em JSON), enviando a redação uma vez só em vez de cinco.
+FUNDIR_CRITERIOS = os.getenv("FUNDIR_CRITERIOS", "false").strip().lower() in ("1", "true", "sim", "yes")
+# Folga de tokens para o JSON {"c1": int, ..., "c5": int} da chamada única.
+MAX_TOKENS_JSON = 60
+
+# Templates já compilados e modelos por critério ({prefixo: ...}), montados uma vez
+# em main() via monta_templates. No modo FUNDIR_CRITERIOS, guardam apenas a entrada
+# da chamada única, sob a chave CHAVE_UNICA.
+TEMPLATES: dict[str, ChatPromptTemplate] = {}
+LLMS: dict[str, ChatOpenAI] = {}
+CHAVE_UNICA = "todos"
+
 
 # -----------------------------
 # Utilitários de leitura/escrita
@@ -35,18 +96,26 @@ def ler_scores() -> dict:
     """
     if not ARQUIVO_SCORE.exists():
         raise FileNotFoundError(f"Arquivo de scores não encontrado: {ARQUIVO_SCORE}")
-    with open(ARQUIVO_SCORE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(ARQUIVO_SCORE.read_bytes())
+
+
+def indexa_descricoes(score_descricao: dict) -> dict[tuple[str, int], str]:
+    """
+    Achata {criterio: {nota_str: descricao}} em {(criterio, nota_int): descricao},
+    para buscar a descrição de cada nota com uma única consulta.
+    """
+    return {
+        (criterio, int(nota)): descricao
+        for criterio, notas in score_descricao.items()
+        for nota, descricao in notas.items()
+    }
 
 
 def ler_arquivo(path: os.PathLike | str) -> str:
     """
     Lê um arquivo de texto (UTF-8) e retorna seu conteúdo como string.
-    Aceita Path ou str.
+    Aceita Path ou str. Se o arquivo não existir, open() levanta FileNotFoundError.
     """
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Arquivo não encontrado: {path}")
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
@@ -56,50 +125,126 @@ def escreve_json_score(data: dict | list, path: Path) -> None:
     Escreve um dicionário/lista em JSON (UTF-8) com indentação.
     """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def repara_resultados_parciais() -> None:
+    """
+    Garante que ARQUIVO_PARCIAL termina em '\\n' antes de anexar novas linhas.
+    Uma última linha incompleta (execução interrompida no meio da escrita) é
+    descartada; a redação correspondente volta a ficar pendente.
+    """
+    if not ARQUIVO_PARCIAL.exists():
+        return
+    conteudo = ARQUIVO_PARCIAL.read_bytes()
+    if not conteudo or conteudo.endswith(b"\n"):
+        return
+    print(f"Aviso: descartando linha incompleta no final de {ARQUIVO_PARCIAL}")
+    with open(ARQUIVO_PARCIAL, "r+b") as f:
+        f.truncate(conteudo.rfind(b"\n") + 1)
+
+
+def ler_resultados_parciais() -> tuple[list[dict], int]:
+    """
+    Lê ARQUIVO_PARCIAL (JSONL) e retorna (avaliações já concluídas, nº de linhas inválidas).
+    Se o arquivo não existir, retorna ([], 0).
+    """
+    if not ARQUIVO_PARCIAL.exists():
+        return [], 0
+    avaliacoes: list[dict] = []
+    invalidas = 0
+    for linha in ARQUIVO_PARCIAL.read_bytes().splitlines():
+        if not linha.strip():
+            continue
+        try:
+            avaliacoes.append(orjson.loads(linha))
+        except orjson.JSONDecodeError:
+            invalidas += 1
+            print(f"Aviso: linha inválida ignorada em {ARQUIVO_PARCIAL}")
+    return avaliacoes, invalidas
 
 
+@functools.lru_cache(maxsize=None)
 def ler_system_prompt(path: str) -> str:
     """
     Carrega um system prompt a partir do nome do arquivo contido em DIRETORIO_PROMPTS.
+    O resultado é memorizado e tem os espaços finais removidos, para que o prefixo
+    enviado ao provedor seja sempre idêntico (condição para o cache de prompt).
     """
     full_path = DIRETORIO_PROMPTS / path
-    prompts = ler_arquivo(full_path)
+    prompts = ler_arquivo(full_path).rstrip()
     return prompts
 
 
-def ler_redacao() -> dict:
+def ler_redacao() -> Iterator[tuple[str, str]]:
     """
-    Lê todos os arquivos .txt do diretório de redações e
-    retorna um dict {nome_arquivo: conteúdo}.
+    Retorna um gerador que percorre os arquivos .txt do diretório de redações
+    sob demanda, gerando pares (nome_arquivo, conteúdo). Cada arquivo só é lido
+    quando o consumidor pede o próximo item.
     """
     if not DIRETORIO_REDACAO.exists():
         raise FileNotFoundError(f"Diretório de redações não encontrado: {DIRETORIO_REDACAO}")
-    redacoes: dict[str, str] = {}
-    for arquivo in os.listdir(DIRETORIO_REDACAO):
-        if arquivo.endswith(".txt"):
-            caminho_completo = DIRETORIO_REDACAO / arquivo
-            conteudo = ler_arquivo(caminho_completo)
-            redacoes[arquivo] = conteudo
-    if not redacoes:
-        print(f"Aviso: nenhum .txt encontrado em {DIRETORIO_REDACAO}")
-    return redacoes
+
+    def _gera() -> Iterator[tuple[str, str]]:
+        encontrou = False
+        with os.scandir(DIRETORIO_REDACAO) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".txt") and entrada.is_file():
+                    encontrou = True
+                    yield entrada.name, Path(entrada.path).read_text(encoding="utf-8")
+        if not encontrou:
+            print(f"Aviso: nenhum .txt encontrado em {DIRETORIO_REDACAO}")
+
+    return _gera()
+
+
+def conta_redacoes_pendentes(ja_avaliadas: set[str]) -> int:
+    """
+    Conta os .txt do diretório de redações que ainda não estão em ja_avaliadas
+    (nomes sem '.txt'), sem ler o conteúdo dos arquivos.
+    """
+    with os.scandir(DIRETORIO_REDACAO) as entradas:
+        return sum(
+            1
+            for entrada in entradas
+            if entrada.name.endswith(".txt")
+            and entrada.is_file()
+            and entrada.name.replace('.txt', '') not in ja_avaliadas
+        )
 
 
 # -----------------------------
 # Parser para saída numérica
 # -----------------------------
-class NumberOutputParser(StrOutputParser):
-    """Parseia a saída do LLM garantindo valor numérico (float)."""
+# Notas válidas por critério. Ancorar nessa grade evita ler números soltos do
+# texto, como o "1" de "C1: 160".
+NOTAS_VALIDAS = (0, 40, 80, 120, 160, 200)
+_NUM_RE = re.compile(
+    r"(?<![\w.])(?:" + "|".join(map(str, NOTAS_VALIDAS)) + r")(?:\.0+)?(?!\w|\.\d)"
+)
 
-    def parse(self, text: str) -> float:  # type: ignore[override]
-        try:
-            return float(text.strip())
-        except ValueError as err:  # validação simples
-            raise OutputParserException(
-                f"Expected numeric output, got: {text}"
-            ) from err
+
+def parse_number(text: str) -> float:
+    """
+    Extrai a nota (0, 40, ..., 200) da saída do LLM, tolerando texto extra.
+    Se não houver nota válida, loga o problema e faz fallback para 0.0.
+
+    >>> parse_number("160")
+    160.0
+    >>> parse_number("Nota: 80")
+    80.0
+    >>> parse_number("C1: 160")
+    160.0
+    >>> parse_number("200.0")
+    200.0
+    >>> parse_number("Nota: 120.")
+    120.0
+    """
+    m = _NUM_RE.search(text)
+    if m is None:
+        print(f"Aviso: saída não-numérica do LLM: {text!r}")
+        return 0.0
+    return float(m.group())
 
 
 # -----------------------------
@@ -108,8 +253,9 @@ class NumberOutputParser(StrOutputParser):
 def carrega_prompt() -> list[dict]:
     """
     Percorre a lista ARQIVOS_PROMPTS e monta uma lista de dicts:
-    [{'prefixo': 'c1', 'prompt': '<conteúdo>'}, ...]
+    [{'prefixo': 'c1', 'prompt': '<conteúdo>', 'model': '<modelo>'}, ...]
     O prefixo é inferido pelo trecho antes do primeiro '_'.
+    O modelo é MODELO, salvo se houver EVAL_MODEL_<PREFIXO> definido.
     """
     if not DIRETORIO_PROMPTS.exists():
         raise FileNotFoundError(f"Diretório de prompts não encontrado: {DIRETORIO_PROMPTS}")
@@ -121,6 +267,7 @@ def carrega_prompt() -> list[dict]:
         prompt = ler_system_prompt(prompt_path)
         _prompt['prefixo'] = prefixo_prompt
         _prompt['prompt'] = prompt
+        _prompt['model'] = os.getenv(f"EVAL_MODEL_{prefixo_prompt.upper()}", MODELO)
         prompts.append(_prompt)
     return prompts
 
@@ -128,90 +275,439 @@ def carrega_prompt() -> list[dict]:
 # -----------------------------
 # Avaliação via LLM
 # -----------------------------
-def avaliar_redacao(prompt: str, redacao: str) -> float:
+def configura_cache() -> None:
     """
-    Dado um system prompt e o texto da redação, invoca a cadeia LLM -> parser numérico.
+    Ativa o cache local (SQLite) das respostas do LLM: reexecuções com o mesmo
+    (modelo, parâmetros, mensagens) não chamam a API novamente.
+    O cache guarda a resposta como veio, inclusive saídas não-numéricas; para
+    reavaliar essas redações, apague ARQUIVO_CACHE_LLM.
+    """
+    set_llm_cache(SQLiteCache(database_path=str(ARQUIVO_CACHE_LLM)))
+
+
+def parametros_geracao(modelo: str, max_tokens: int) -> dict:
+    """
+    Retorna os parâmetros de geração para o modelo: temperature=0 (respostas mais
+    determinísticas) e o limite de tokens de saída. Modelos de raciocínio recebem
+    {}: aceitam apenas a temperature padrão e consumiriam o limite de saída antes
+    de escrever a resposta.
+    """
+    if modelo.startswith(PREFIXOS_MODELOS_RACIOCINIO):
+        return {}
+    return {"temperature": 0, "max_tokens": max_tokens}
+
+
+def cria_llm(modelo: str, max_tokens: int, **kwargs) -> ChatOpenAI:
+    """
+    Cria o cliente do modelo com os parâmetros de parametros_geracao; as novas
+    tentativas ficam a cargo de invoca_com_retry (max_retries=0 evita repetir em dobro).
+    """
+    return ChatOpenAI(
+        model=modelo,
+        max_retries=0,
+        **parametros_geracao(modelo, max_tokens),
+        **kwargs,
+    )
+
+
+def monta_templates(prompts: list[dict]) -> None:
+    """
+    Compila, uma única vez, o template de cada critério em TEMPLATES e associa
+    o modelo correspondente em LLMS. Critérios com o mesmo modelo compartilham
+    a mesma instância (e o pool de conexões HTTP do cliente assíncrono).
+    """
+    llms: dict[str, ChatOpenAI] = {}
+    for prompt in prompts:
+        TEMPLATES[prompt['prefixo']] = ChatPromptTemplate.from_messages(
+            [
+                ("system", prompt['prompt']),
+                ("user", "{redacao}"),
+            ]
+        )
+        modelo = prompt.get('model', MODELO)
+        if modelo not in llms:
+            llms[modelo] = cria_llm(modelo, MAX_TOKENS_NOTA)
+        LLMS[prompt['prefixo']] = llms[modelo]
+
+
+@retry(
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception_type(
+        (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+    ),
+    reraise=True,
+)
+async def invoca_com_retry(chave: str, redacao: str) -> BaseMessage:
+    """
+    Formata as mensagens com o template de `chave` e chama o modelo correspondente,
+    com nova tentativa (backoff exponencial com jitter) apenas para erros transitórios
+    da API (429, timeout, conexão, 5xx). Demais erros sobem direto.
+    A chave é usada como prompt_cache_key, para que a OpenAI reaproveite o system
+    prompt (estático) entre redações.
+    """
+    mensagens = TEMPLATES[chave].format_messages(redacao=redacao)
+    return await LLMS[chave].ainvoke(mensagens, extra_body={"prompt_cache_key": chave})
+
+
+async def avaliar_redacao_async(prefixo: str, redacao: str) -> float:
+    """
+    Dado o prefixo do critério e o texto da redação, invoca (de forma assíncrona)
+    o modelo do critério e extrai a nota numérica da resposta.
     Retorna a nota (float). Em caso de falha de parsing, retorna 0.0.
     """
-    prompt_tpl = ChatPromptTemplate.from_messages(
+    resposta = await invoca_com_retry(prefixo, redacao)
+    return parse_number(resposta.content)
+
+
+# Início do trecho final de cada prompt de critério que pede "APENAS um número";
+# na chamada única ele contradiria a instrução de responder em JSON.
+_INSTRUCAO_SAIDA_RE = re.compile(r"^- Responda com APENAS um número", re.MULTILINE)
+
+
+def remove_instrucao_saida(prompt: str) -> str:
+    """
+    Remove do system prompt de um critério as instruções finais de formato de saída
+    (resposta só com o número, exemplo de saída), mantendo os critérios de avaliação.
+    """
+    m = _INSTRUCAO_SAIDA_RE.search(prompt)
+    if m is None:
+        return prompt
+    return prompt[:m.start()].rstrip()
+
+
+def monta_template_unico(prompts: list[dict]) -> None:
+    """
+    Monta, sob CHAVE_UNICA, o template e o modelo que avaliam todos os critérios
+    numa única chamada: os system prompts são concatenados sob cabeçalhos
+    '## Critério C1' ... e a resposta é restrita (response_format json_schema)
+    a um objeto {'c1': int, ..., 'c5': int}.
+    """
+    prefixos = [p['prefixo'] for p in prompts]
+    secoes = [
+        f"## Critério {p['prefixo'].upper()}\n{remove_instrucao_saida(p['prompt'])}"
+        for p in prompts
+    ]
+    formato = ", ".join(f'"{prefixo}": int' for prefixo in prefixos)
+    system = (
+        "\n\n".join(secoes)
+        + "\n\nAvalie a redação em TODOS os critérios acima. "
+        + f"Retorne APENAS JSON {{{formato}}}."
+    )
+
+    schema = {
+        "type": "object",
+        "properties": {
+            prefixo: {"type": "integer", "enum": list(NOTAS_VALIDAS)} for prefixo in prefixos
+        },
+        "required": prefixos,
+        "additionalProperties": False,
+    }
+    LLMS[CHAVE_UNICA] = cria_llm(
+        MODELO,
+        MAX_TOKENS_JSON,
+        model_kwargs={
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "notas_criterios", "strict": True, "schema": schema},
+            }
+        },
+    )
+
+    TEMPLATES[CHAVE_UNICA] = ChatPromptTemplate.from_messages(
         [
-            ("system", prompt),
+            # Chaves literais do JSON precisam ser escapadas para o template.
+            ("system", system.replace("{", "{{").replace("}", "}}")),
             ("user", "{redacao}"),
         ]
     )
 
-    # temperature=0 para respostas mais determinísticas;
-    # parser numérico reforça que a saída seja somente número.
-    chain = prompt_tpl | ChatOpenAI(model="gpt-5", temperature=0) | NumberOutputParser()
 
+async def avaliar_redacao_unica_async(redacao: str, prompts: list[dict]) -> list[float]:
+    """
+    Avalia a redação em todos os critérios com a chamada única (CHAVE_UNICA).
+    Retorna as notas na ordem de prompts. Se a resposta não for um objeto JSON,
+    faz fallback para 0.0 em todos os critérios; notas fora de NOTAS_VALIDAS
+    também viram 0.0, como no fluxo por critério.
+    """
+    resposta = await invoca_com_retry(CHAVE_UNICA, redacao)
     try:
-        score: float = chain.invoke({"redacao": redacao})
-    except OutputParserException as e:
-        # Em caso de saída não-numérica, faz fallback para 0.0 e loga o problema.
-        print(f"Aviso: saída não-numérica do LLM. Erro: {e}")
-        score = 0.0
-    return score
+        notas = orjson.loads(resposta.content)
+    except orjson.JSONDecodeError:
+        notas = None
+    if not isinstance(notas, dict):
+        print(f"Aviso: saída do LLM não é um objeto JSON: {resposta.content!r}")
+        notas = {}
+
+    scores: list[float] = []
+    for p in prompts:
+        nota = notas.get(p['prefixo'], 0)
+        if nota not in NOTAS_VALIDAS or isinstance(nota, bool):
+            print(f"Aviso: nota fora da grade para {p['prefixo']}: {nota!r}")
+            nota = 0
+        scores.append(float(nota))
+    return scores
 
 
 # -----------------------------
 # Execução principal
 # -----------------------------
-if __name__ == "__main__":
-    # Checagens rápidas de pré-condições (diretórios/arquivos).
-    if not DIRETORIO_PROMPTS.exists():
-        print(f"Erro: diretório de prompts inexistente: {DIRETORIO_PROMPTS}")
-        sys.exit(1)
-    if not DIRETORIO_REDACAO.exists():
-        print(f"Erro: diretório de redações inexistente: {DIRETORIO_REDACAO}")
-        sys.exit(1)
-    if not ARQUIVO_SCORE.exists():
-        print(f"Erro: arquivo de descrição de score inexistente: {ARQUIVO_SCORE}")
-        sys.exit(1)
+def monta_avaliacao(
+    nome: str, prompts: list[dict], scores: list[float], descricoes: dict[tuple[str, int], str]
+) -> dict:
+    """
+    Monta o registro de avaliação de uma redação a partir das notas por critério:
+    {'redacao_nome': ..., 'nota_criterio': soma, 'avaliacoes': [...]}.
+    """
+    return {
+        'redacao_nome': nome.replace('.txt', ''),
+        'nota_criterio': math.fsum(scores),  # soma das notas por critério
+        'avaliacoes': [
+            {
+                'criterio': prompt['prefixo'],
+                'nota': score,
+                # Busca a descrição correspondente; se não existir, coloca mensagem padrão.
+                'descricao': descricoes.get(
+                    (prompt['prefixo'], int(score)),
+                    f"Descrição não encontrada para {int(score)} em {prompt['prefixo']}",
+                ),
+            }
+            for prompt, score in zip(prompts, scores)
+        ],
+    }
+
+
+async def avaliar_uma_redacao(
+    nome: str, texto: str, prompts: list[dict], descricoes: dict[tuple[str, int], str]
+) -> dict:
+    """
+    Avalia uma redação em todos os critérios (em paralelo, ou numa única chamada
+    se FUNDIR_CRITERIOS) e monta o registro.
+    """
+    if FUNDIR_CRITERIOS:
+        scores = await avaliar_redacao_unica_async(texto, prompts)
+        return monta_avaliacao(nome, prompts, scores, descricoes)
 
-    print("Iniciando avaliação de redações...")
-    prompts = carrega_prompt()
-    redacoes = ler_redacao()
-    score_descricao = ler_scores()
+    # Avalia os critérios em paralelo: as chamadas são independentes entre si.
+    tasks = [avaliar_redacao_async(p['prefixo'], texto) for p in prompts]
+    scores = await asyncio.gather(*tasks)
 
-    avaliacao_geral: list[dict] = []
+    return monta_avaliacao(nome, prompts, scores, descricoes)
 
-    for redacao_nome, redacao in redacoes.items():
-        # Monta o registro de avaliação para a redação atual
-        avaliacao_redacao: dict = {}
-        redacao_nome = redacao_nome.replace('.txt', '')
-        avaliacao_redacao['redacao_nome'] = redacao_nome
-        avaliacao_redacao['nota_criterio'] = 0.0  # soma das notas por critério
-        avaliacao_redacao['avaliacoes'] = []
 
-        # Avalia em cada critério/prompt
+# -----------------------------
+# Avaliação via Batch API
+# -----------------------------
+def monta_batch_jsonl(redacoes: dict[str, str], prompts: list[dict]) -> bytes:
+    """
+    Gera o conteúdo JSONL do batch: uma linha por (redação, critério),
+    identificada por custom_id no formato '<nome>|<prefixo>'.
+    """
+    linhas: list[bytes] = []
+    for nome, redacao in redacoes.items():
         for prompt in prompts:
-            score = avaliar_redacao(prompt['prompt'], redacao)
+            modelo = prompt.get('model', MODELO)
+            corpo = {
+                "model": modelo,
+                **parametros_geracao(modelo, MAX_TOKENS_NOTA),
+                "prompt_cache_key": prompt['prefixo'],
+                "messages": [
+                    {"role": "system", "content": prompt['prompt']},
+                    {"role": "user", "content": redacao},
+                ],
+            }
+            requisicao = {
+                "custom_id": f"{nome}|{prompt['prefixo']}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": corpo,
+            }
+            linhas.append(orjson.dumps(requisicao))
+    return b"\n".join(linhas) + b"\n"
+
+
+def le_saida_batch(conteudo: str) -> dict[tuple[str, str], float]:
+    """
+    Lê um JSONL de resultado do batch (arquivo de saída ou de erros) e retorna
+    {(nome, prefixo): nota} apenas para as requisições bem-sucedidas.
+    Requisições com erro são logadas e ficam de fora, para não virarem nota 0.0.
+    """
+    notas: dict[tuple[str, str], float] = {}
+    for linha in conteudo.splitlines():
+        if not linha.strip():
+            continue
+        item = orjson.loads(linha)
+        nome, prefixo = item["custom_id"].rsplit("|", 1)
+        resposta = item.get("response") or {}
+        if item.get("error") or resposta.get("status_code") != 200:
+            erro = item.get("error") or (resposta.get("body") or {}).get("error")
+            print(f"Aviso: falha no batch para {item['custom_id']}: {erro}")
+            continue
+        texto = resposta["body"]["choices"][0]["message"]["content"]
+        notas[(nome, prefixo)] = parse_number(texto)
+    return notas
+
+
+async def avaliar_via_batch(
+    redacoes: dict[str, str], prompts: list[dict], descricoes: dict[tuple[str, int], str]
+) -> list[dict]:
+    """
+    Submete todas as combinações (redação x critério) em um único batch da OpenAI,
+    aguarda a conclusão e monta a lista de avaliações no mesmo formato do fluxo direto.
+    Redações com algum critério que falhou (ou sem resposta) ficam de fora do retorno,
+    permanecendo pendentes para a próxima execução.
+    Se ARQUIVO_BATCH existir, retoma o batch salvo em vez de enviar um novo.
+    """
+    if not redacoes and not ARQUIVO_BATCH.exists():
+        # Nada pendente: a API recusa batch vazio.
+        print("Nenhuma redação pendente para enviar ao batch.")
+        return []
+
+    client = AsyncOpenAI()
+
+    if ARQUIVO_BATCH.exists():
+        batch = await client.batches.retrieve(ARQUIVO_BATCH.read_text(encoding="utf-8").strip())
+        print(f"Retomando batch: {batch.id} (status '{batch.status}')")
+    else:
+        arquivo = await client.files.create(
+            file=("batch_input.jsonl", monta_batch_jsonl(redacoes, prompts)),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=arquivo.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        ARQUIVO_BATCH.write_text(batch.id, encoding="utf-8")
+        print(f"Batch enviado: {batch.id} (id salvo em {ARQUIVO_BATCH})")
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_INTERVALO_POLL)
+        batch = await client.batches.retrieve(batch.id)
+        print(f"Status do batch {batch.id}: {batch.status}")
+
+    if batch.status != "completed":
+        # Batches expirados/cancelados podem ter resultados parciais: aproveita o que houver.
+        print(f"Aviso: batch {batch.id} terminou com status '{batch.status}'")
+
+    notas: dict[tuple[str, str], float] = {}
+    for arquivo_id in (batch.output_file_id, batch.error_file_id):
+        if arquivo_id:
+            conteudo = await client.files.content(arquivo_id)
+            notas.update(le_saida_batch(conteudo.text))
+    # Batch encerrado e lido: uma nova execução envia um novo batch para o que ficar pendente.
+    ARQUIVO_BATCH.unlink()
+
+    avaliacoes: list[dict] = []
+    for nome in redacoes:
+        faltando = [p['prefixo'] for p in prompts if (nome, p['prefixo']) not in notas]
+        if faltando:
+            print(f"Aviso: {nome} fica pendente (sem nota no batch para {', '.join(faltando)})")
+            continue
+        avaliacoes.append(
+            monta_avaliacao(
+                nome, prompts, [notas[(nome, p['prefixo'])] for p in prompts], descricoes
+            )
+        )
+    return avaliacoes
 
-            # Para mapear a descrição, a chave no JSON é string de inteiro (ex.: "0", "40", "80"...)
-            _s_score = str(int(score))
 
-            _avaliacao: dict = {}
-            _avaliacao['criterio'] = prompt['prefixo']
-            _avaliacao['nota'] = score
-            avaliacao_redacao['nota_criterio'] += score
+async def main() -> None:
+    print("Iniciando avaliação de redações...")
+    prompts = carrega_prompt()
+    redacoes = ler_redacao()
+    descricoes = indexa_descricoes(ler_scores())
+    configura_cache()
+    if FUNDIR_CRITERIOS:
+        # A chamada única usa sempre MODELO: overrides por critério não se aplicam.
+        ignorados = [p['prefixo'] for p in prompts if p['model'] != MODELO]
+        if ignorados:
+            print(
+                "Aviso: FUNDIR_CRITERIOS=true usa apenas EVAL_MODEL; "
+                f"EVAL_MODEL_<CRITERIO> ignorado para: {', '.join(ignorados)}"
+            )
+        monta_template_unico(prompts)
+    else:
+        monta_templates(prompts)
+
+    # Retoma uma execução interrompida: redações já presentes no JSONL parcial são puladas.
+    repara_resultados_parciais()
+    ja_avaliadas = {a['redacao_nome'] for a in ler_resultados_parciais()[0]}
+    if ja_avaliadas:
+        print(f"Retomando: {len(ja_avaliadas)} redação(ões) já avaliada(s) em {ARQUIVO_PARCIAL}")
+    pendentes = (
+        (n, t) for n, t in redacoes if n.replace('.txt', '') not in ja_avaliadas
+    )
 
-            # Busca a descrição correspondente; se não existir, coloca mensagem padrão.
-            _descricao = score_descricao.get(prompt['prefixo'], {}).get(
-                _s_score, f"Descrição não encontrada para {_s_score} em {prompt['prefixo']}"
+    inicio = time.perf_counter()
+    concluidas = 0
+    ultima: dict | None = None
+
+    with open(ARQUIVO_PARCIAL, "ab") as parcial:
+
+        def registra(avaliacao_redacao: dict, total: int) -> None:
+            # Grava a redação no JSONL assim que termina e loga o progresso e o tempo decorrido.
+            nonlocal concluidas, ultima
+            parcial.write(orjson.dumps(avaliacao_redacao) + b"\n")
+            parcial.flush()
+            concluidas += 1
+            ultima = avaliacao_redacao
+            print(
+                f"[{concluidas}/{total}] Avaliada: {avaliacao_redacao['redacao_nome']} | "
+                f"Soma dos critérios: {avaliacao_redacao['nota_criterio']} | "
+                f"{time.perf_counter() - inicio:.1f}s"
             )
-            _avaliacao['descricao'] = _descricao
 
-            avaliacao_redacao['avaliacoes'].append(_avaliacao)
+        if USAR_BATCH:
+            # O batch precisa de todas as redações de uma vez (um único JSONL).
+            resultados = await avaliar_via_batch(dict(pendentes), prompts, descricoes)
+            for avaliacao_redacao in resultados:
+                registra(avaliacao_redacao, len(resultados))
+        else:
+            # MAX_CONCURRENCY workers puxam redações do gerador compartilhado: só há
+            # MAX_CONCURRENCY redações em memória/avaliação por vez, e cada uma é
+            # registrada assim que termina. O total vem só da listagem do diretório.
+            total = conta_redacoes_pendentes(ja_avaliadas)
 
-        # Adiciona o resultado desta redação ao agregado
-        avaliacao_geral.append(avaliacao_redacao)
+            async def worker() -> None:
+                for nome, texto in pendentes:
+                    registra(await avaliar_uma_redacao(nome, texto, prompts, descricoes), total)
 
-        # Log simples por redação (opcional)
-        print(f"Avaliada: {avaliacao_redacao['redacao_nome']} | Soma dos critérios: {avaliacao_redacao['nota_criterio']}")
+            await asyncio.gather(*[worker() for _ in range(max(1, MAX_CONCURRENCY))])
 
     # Exibe a última avaliação processada (mantido do código original)
-    print(avaliacao_redacao)
+    if ultima is not None:
+        print(ultima)
+
+    # Consolida o JSONL no JSON final e descarta o parcial. As redações terminam em
+    # ordem arbitrária; ordenar por nome deixa o arquivo final determinístico.
+    avaliacoes, invalidas = ler_resultados_parciais()
+    avaliacao_geral = sorted(avaliacoes, key=lambda a: a['redacao_nome'])
+    escreve_json_score(data=avaliacao_geral, path=ARQUIVO_RESULTADO)
+    print(f"Arquivo salvo em: {ARQUIVO_RESULTADO}")
+    if invalidas:
+        # Não apaga o parcial: as linhas inválidas precisam ser conferidas antes.
+        print(f"Aviso: {invalidas} linha(s) inválida(s) em {ARQUIVO_PARCIAL}; arquivo mantido")
+    else:
+        ARQUIVO_PARCIAL.unlink()
+
+
+if __name__ == "__main__":
+    # Checagens rápidas de pré-condições (diretórios/arquivos).
+    if not DIRETORIO_PROMPTS.exists():
+        print(f"Erro: diretório de prompts inexistente: {DIRETORIO_PROMPTS}")
+        sys.exit(1)
+    if not DIRETORIO_REDACAO.exists():
+        print(f"Erro: diretório de redações inexistente: {DIRETORIO_REDACAO}")
+        sys.exit(1)
+    if not ARQUIVO_SCORE.exists():
+        print(f"Erro: arquivo de descrição de score inexistente: {ARQUIVO_SCORE}")
+        sys.exit(1)
+    if USAR_BATCH and FUNDIR_CRITERIOS:
+        print("Erro: BATCH=true e FUNDIR_CRITERIOS=true não podem ser usados juntos")
+        sys.exit(1)
+    if not os.getenv("OPENAI_API_KEY"):
+        print("Erro: variável de ambiente OPENAI_API_KEY não definida (veja o .env)")
+        sys.exit(1)
 
-    # Persiste o resultado completo em JSON
-    escreve_json_score(data=avaliacao_geral, path=BASE_DIR / "resultado_nota.json")
-    print(f"Arquivo salvo em: {BASE_DIR / 'resultado_nota.json'}")
+    asyncio.run(main())